@@ -0,0 +1,210 @@
+"""
+Image decoding, letterboxing and fire post-processing shared by the API and its
+CPU scan worker processes
+
+Kept free of FastAPI and the app's global state, so spawned scan workers only
+import what they need to decode frames and run the exported CPU model.
+"""
+
+import io
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+import torch
+from PIL import ExifTags, Image
+from ultralytics.utils import ops
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+    turbo_jpeg = TurboJPEG()
+except (ImportError, OSError, RuntimeError):
+    # PyTurboJPEG or the libturbojpeg shared library is missing
+    turbo_jpeg = None
+
+logger = logging.getLogger(__name__)
+
+JPEG_EXTENSIONS = {'.jpg', '.jpeg'}
+
+# Inference settings
+IMGSZ = 640
+CONF_THRESHOLD = 0.5
+IOU_THRESHOLD = 0.5
+MAX_DETECTIONS = 20
+
+# Scan worker state, set by init_scan_worker() in each worker process: a
+# (1, 3, IMGSZ, IMGSZ) -> raw predictions callable and the served classes
+worker_infer = None
+worker_class_names: Dict[int, str] = {}
+worker_fire_class_ids: List[int] = []
+worker_buffer = None
+
+
+def jpeg_orientation(data: bytes) -> int:
+    """Return the EXIF orientation of an encoded JPEG (1, upright, when untagged or unreadable)"""
+    try:
+        # Image.open only parses the headers, the pixels are never decoded
+        with Image.open(io.BytesIO(data)) as image:
+            return image.getexif().get(ExifTags.Base.Orientation, 1)
+    except Exception:
+        return 1
+
+
+def read_image(full_image_path: Path) -> np.ndarray:
+    """Read an image file into a BGR array, decoding JPEGs with libjpeg-turbo when available"""
+    if turbo_jpeg is not None and full_image_path.suffix.lower() in JPEG_EXTENSIONS:
+        data = full_image_path.read_bytes()
+        # TurboJPEG ignores EXIF orientation; rotated frames go to cv2.imread, which applies it
+        if jpeg_orientation(data) == 1:
+            try:
+                return turbo_jpeg.decode(data, pixel_format=TJPF_BGR)
+            except OSError as e:
+                logger.warning("TurboJPEG could not decode %s, falling back to OpenCV: %s", full_image_path, e)
+
+    image = cv2.imread(str(full_image_path))
+    if image is None:
+        raise ValueError(f"Cannot open image file: {full_image_path}")
+    return image
+
+
+def letterbox_geometry(h: int, w: int) -> Tuple[int, int, int, int]:
+    """Resized (height, width) and (top, left) padding of ultralytics' centered letterbox"""
+    gain = min(IMGSZ / h, IMGSZ / w)
+    nh, nw = int(round(h * gain)), int(round(w * gain))
+    top = int(round((IMGSZ - nh) / 2 - 0.1))
+    left = int(round((IMGSZ - nw) / 2 - 0.1))
+    return nh, nw, top, left
+
+
+def resize_into(buffer: torch.Tensor, image: np.ndarray, nh: int, nw: int) -> torch.Tensor:
+    """Resize a BGR image into the front of a flat uint8 staging buffer as an (nh, nw, 3) view"""
+    resized = buffer[:nh * nw * 3].view(nh, nw, 3)
+    dst = resized.numpy()
+    out = cv2.resize(image, (nw, nh), dst=dst, interpolation=cv2.INTER_LINEAR)
+    if out is not dst:
+        np.copyto(dst, out)
+    return resized
+
+
+def nms(preds, fire_class_ids: List[int]) -> List[torch.Tensor]:
+    """
+    Apply NMS tuned for a fire detector: class-agnostic, capped at MAX_DETECTIONS,
+    and restricted to fire classes so other boxes never reach post-processing
+    """
+    return ops.non_max_suppression(
+        preds,
+        CONF_THRESHOLD,
+        IOU_THRESHOLD,
+        classes=fire_class_ids,
+        agnostic=True,
+        max_det=MAX_DETECTIONS
+    )
+
+
+def parse_result(det: torch.Tensor, orig_shape: Tuple[int, int], class_names: Dict[int, str]) -> Dict:
+    """
+    Summarize fire detections for a single image
+
+    Args:
+        det: (n, 6) fire-class NMS rows of [x1, y1, x2, y2, conf, cls] in input space
+        orig_shape: Original (height, width) to map boxes back onto
+        class_names: Class names of the model that produced the detections
+
+    Returns:
+        Dictionary containing detection results
+    """
+    fire_detected = False
+    max_confidence = 0.0
+    detections = []
+
+    if len(det):
+        # NMS already dropped non-fire classes; copy the surviving rows back once
+        fire_detected = True
+        fire = det.to("cpu", torch.float32, copy=True)
+        max_confidence = fire[:, 4].max().item()
+
+        xyxy = ops.scale_boxes((IMGSZ, IMGSZ), fire[:, :4], orig_shape)
+        detections = [
+            {
+                "class": class_names[cls_id],
+                "confidence": conf,
+                "bbox": bbox
+            }
+            for cls_id, conf, bbox in zip(
+                fire[:, 5].to(torch.int64).tolist(), fire[:, 4].tolist(), xyxy.tolist()
+            )
+        ]
+
+    # Final confidence score
+    final_confidence = max_confidence if detections else 0.0
+
+    return {
+        "fire_detected": fire_detected,
+        "accuracy": final_confidence,
+        "frame_count": 1,
+        "total_frames_sampled": 1,
+        "detections": detections
+    }
+
+
+def init_scan_worker(model_path: str, names: Dict[int, str], fire_ids: List[int]):
+    """
+    Load the CPU model (OpenVINO or ONNX Runtime) single-threaded in a scan
+    worker process and run one dummy inference, so the first scan after
+    startup or a pool restart doesn't pay for compilation
+    """
+    global worker_infer, worker_class_names, worker_fire_class_ids, worker_buffer
+
+    # One core per worker so parallel workers don't oversubscribe the CPU
+    torch.set_num_threads(1)
+    cv2.setNumThreads(1)
+
+    path = Path(model_path)
+    if path.is_dir():
+        import openvino as ov
+        compiled = ov.Core().compile_model(
+            str(next(path.glob("*.xml"))), "CPU", {"INFERENCE_NUM_THREADS": 1}
+        )
+        request = compiled.create_infer_request()
+        output = compiled.output(0)
+
+        def infer(blob: np.ndarray) -> np.ndarray:
+            return request.infer({0: blob})[output]
+    else:
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = 1
+        options.inter_op_num_threads = 1
+        session = ort.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+        input_name = session.get_inputs()[0].name
+
+        def infer(blob: np.ndarray) -> np.ndarray:
+            return session.run(None, {input_name: blob})[0]
+
+    infer(np.zeros((1, 3, IMGSZ, IMGSZ), dtype=np.float32))
+    worker_infer = infer
+    worker_class_names = names
+    worker_fire_class_ids = fire_ids
+    worker_buffer = torch.empty(IMGSZ * IMGSZ * 3, dtype=torch.uint8)
+
+
+def ping_scan_worker() -> int:
+    """No-op submitted once per worker at pool start, so every worker initializes up front"""
+    return os.getpid()
+
+
+def detect_in_scan_worker(full_image_path: str) -> Dict:
+    """Detect fire in one image inside a scan worker process"""
+    image = read_image(Path(full_image_path))
+    nh, nw, top, left = letterbox_geometry(*image.shape[:2])
+    src = resize_into(worker_buffer, image, nh, nw)
+
+    tensor = torch.full((1, 3, IMGSZ, IMGSZ), 114 / 255.0, dtype=torch.float32)
+    tensor[0, :, top:top + nh, left:left + nw] = src.permute(2, 0, 1).flip(0).float().div_(255.0)
+
+    preds = worker_infer(tensor.numpy())
+    det = nms(torch.from_numpy(preds), worker_fire_class_ids)[0]
+    return parse_result(det, image.shape[:2], worker_class_names)
@@ -5,25 +5,59 @@ Integrates YOLOv8 for real-time fire detection in CCTV feeds
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import cv2
 import numpy as np
 from pathlib import Path
 import logging
 from datetime import datetime
+import asyncio
+import json
+import sqlite3
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from ultralytics import YOLO
+import torch
+import torch.nn.functional as F
+from torchvision.io import ImageReadMode, decode_jpeg
 import os
 
+try:
+    import tritonclient.http.aio as triton_http
+except ImportError:
+    triton_http = None
+
+try:
+    from .inference_core import (
+        CONF_THRESHOLD, IMGSZ, JPEG_EXTENSIONS,
+        detect_in_scan_worker, init_scan_worker, jpeg_orientation, letterbox_geometry,
+        nms, parse_result, ping_scan_worker, read_image, resize_into
+    )
+except ImportError:
+    # Loaded as top-level "main" (uvicorn app_dir, pytest) rather than backend.main
+    from inference_core import (
+        CONF_THRESHOLD, IMGSZ, JPEG_EXTENSIONS,
+        detect_in_scan_worker, init_scan_worker, jpeg_orientation, letterbox_geometry,
+        nms, parse_result, ping_scan_worker, read_image, resize_into
+    )
+
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+# INFO keeps startup and one summary per scan; per-image traces need LOG_LEVEL=DEBUG.
+# An unknown level name falls back to WARNING rather than failing at import
+log_level = logging.getLevelName(os.getenv("LOG_LEVEL", "INFO").upper())
+logging.basicConfig(level=log_level if isinstance(log_level, int) else logging.WARNING)
 logger = logging.getLogger(__name__)
 
 # Initialize FastAPI app
 app = FastAPI(
     title="AI Smart City Fire Detection API",
     description="Real-time fire detection using YOLOv8",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Enable CORS for Next.js frontend
@@ -38,13 +72,83 @@ app.add_middleware(
 # Define base paths
 BASE_DIR = Path(__file__).resolve().parent.parent
 PUBLIC_DIR = BASE_DIR / "public"
-MODEL_PATH = BASE_DIR / "backend" / "models" / "best.pt"
+# Point at best_pruned.pt when setup.py was run with PRUNE_SPARSITY
+MODEL_PATH = Path(os.getenv("MODEL_PATH", str(BASE_DIR / "backend" / "models" / "best.pt")))
+
+# Camera statuses live in SQLite so every uvicorn worker sees the same state
+CAMERA_STATUS_DB = Path(os.getenv("CAMERA_STATUS_DB", str(BASE_DIR / "backend" / "models" / "camera_status.db")))
+
+# Inference settings (IMGSZ and the NMS thresholds live in inference_core)
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "32"))
+USE_FP16 = os.getenv("USE_FP16", "1").lower() not in ("0", "false", "no")
+USE_CUDA_GRAPH = os.getenv("USE_CUDA_GRAPH", "1").lower() not in ("0", "false", "no")
+GPU_JPEG_DECODE = os.getenv("GPU_JPEG_DECODE", "1").lower() not in ("0", "false", "no")
+WARMUP_ITERATIONS = int(os.getenv("WARMUP_ITERATIONS", "3"))
+
+# uvicorn worker processes; CPU thread and process budgets below are split across them
+UVICORN_WORKERS = max(1, int(os.getenv("UVICORN_WORKERS", "1")))
+CPU_THREADS = max(1, (os.cpu_count() or 1) // UVICORN_WORKERS)
+
+# Inference runs off the event loop; one worker is enough to keep a single GPU busy.
+# On CPU a few workers overlap decode/letterbox with the serialized model call, whose
+# forward pass already spreads across cores, so more threads would only oversubscribe
+INFERENCE_WORKERS = int(os.getenv(
+    "INFERENCE_WORKERS", "1" if torch.cuda.is_available() else str(min(4, CPU_THREADS))
+))
+
+# CPU-only scans fan out to worker processes, each with a single-threaded copy of the CPU model
+PROCESS_POOL_WORKERS = int(os.getenv("PROCESS_POOL_WORKERS", str(max(1, CPU_THREADS // 2))))
+
+# Remote inference on a Triton server, used instead of the local model when set
+TRITON_URL = os.getenv("TRITON_URL")
+TRITON_MODEL_NAME = os.getenv("TRITON_MODEL_NAME", "fire_detector")
 
 # Global YOLOv8 model instance
 model = None
 
-# Camera status tracking
-camera_status: Dict[str, Dict] = {}
+# Triton client and the class names it serves, set in connect_triton()
+triton_client = None
+class_names: Dict[int, str] = {}
+
+# Class IDs whose names mark fire, resolved once from class_names
+fire_class_ids: List[int] = []
+
+# Inference device and precision, resolved in load_model()
+device = "cpu"
+half = False
+input_device = torch.device("cpu")
+input_dtype = torch.float32
+
+# Reusable input buffers: one pinned staging buffer shared on CUDA, and one
+# staging buffer per worker thread on CPU (staging_local)
+staging_buffer: Optional[torch.Tensor] = None
+staging_event = None
+staging_local = threading.local()
+batch_buffer: Optional[torch.Tensor] = None
+
+# CUDA graph of a batch-1 forward pass, captured in capture_cuda_graph(); graph_anchors
+# holds the Detect head's captured anchors/strides so later batch sizes can't free them
+cuda_graph = None
+graph_input: Optional[torch.Tensor] = None
+graph_output = None
+graph_anchors: Optional[Tuple[torch.Tensor, torch.Tensor]] = None
+
+# Per-thread SQLite connections to CAMERA_STATUS_DB, opened by get_status_db(), and
+# the threads that use them so a write lock held by another worker never blocks the event loop
+status_db_local = threading.local()
+status_db_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="status-db")
+
+# Latest detection per image path, stored as (mtime_ns, result); a changed file misses
+detection_cache: Dict[str, Tuple[int, Dict]] = {}
+cache_lock = threading.Lock()
+
+# Worker threads for blocking inference, and a lock guarding the model and its
+# shared buffers (pinned staging, batch and CUDA graph tensors) across those workers
+inference_pool = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="inference")
+inference_lock = threading.RLock()
+
+# Process pool for CPU-only /scan-all, started in start_process_pool()
+process_pool: Optional[ProcessPoolExecutor] = None
 
 
 class DetectionRequest(BaseModel):
@@ -78,24 +182,454 @@ class ScanAllResponse(BaseModel):
     timestamp: str
 
 
+def _find_cpu_model() -> Optional[Path]:
+    """Return the first exported CPU model (OpenVINO, then ONNX Runtime) on disk"""
+    candidates = [
+        MODEL_PATH.parent / f"{MODEL_PATH.stem}_int8_openvino_model",
+        MODEL_PATH.parent / f"{MODEL_PATH.stem}_openvino_model",
+        MODEL_PATH.with_name(f"{MODEL_PATH.stem}_int8.onnx"),
+        MODEL_PATH.with_name(f"{MODEL_PATH.stem}_simplified.onnx"),
+    ]
+    for candidate in candidates:
+        if candidate.exists():
+            return candidate
+    return None
+
+
 def load_model():
     """Load YOLOv8 model from disk"""
-    global model
+    global model, device, half, class_names, fire_class_ids
     try:
-        if MODEL_PATH.exists():
-            logger.info(f"Loading YOLOv8 model from {MODEL_PATH}")
+        if torch.cuda.is_available():
+            device = "cuda:0"
+            half = USE_FP16
+            # Fixed 640x640 inputs let cuDNN keep the fastest algorithm it benchmarks
+            torch.backends.cudnn.benchmark = True
+        else:
+            device = "cpu"
+            half = False
+            # Share the cores with the other uvicorn workers instead of each claiming all of them
+            torch.set_num_threads(CPU_THREADS)
+        logger.info("Using device %s (FP16: %s)", device, half)
+        
+        engine_path = MODEL_PATH.with_suffix(".engine")
+        cpu_model_path = None if device != "cpu" else _find_cpu_model()
+        model = None
+        if device != "cpu" and engine_path.exists():
+            try:
+                # The plan is only deserialized by the first predict in setup_predictor()
+                logger.info("Loading TensorRT engine from %s", engine_path)
+                model = YOLO(str(engine_path), task="detect")
+                setup_predictor()
+                logger.info("Engine loaded successfully")
+            except Exception as e:
+                # Plans only load on the TensorRT release that built them
+                logger.warning("Could not load TensorRT engine %s, falling back to PyTorch weights: %s", engine_path, e)
+                model = None
+        
+        if model is not None:
+            pass
+        elif cpu_model_path is not None:
+            logger.info("Loading CPU model from %s", cpu_model_path)
+            model = YOLO(str(cpu_model_path), task="detect")
+            logger.info("CPU model loaded successfully")
+        elif MODEL_PATH.exists():
+            logger.info("Loading YOLOv8 model from %s", MODEL_PATH)
             model = YOLO(str(MODEL_PATH))
             logger.info("Model loaded successfully")
         else:
-            logger.warning(f"Model not found at {MODEL_PATH}")
+            logger.warning("Model not found at %s", MODEL_PATH)
             logger.info("Attempting to load YOLOv8n (nano) from Ultralytics")
             # Download YOLOv8n if model file doesn't exist
             model = YOLO("yolov8n.pt")
+        
+        if model.predictor is None:
+            setup_predictor()
+        class_names = model.names
+        fire_class_ids = find_fire_class_ids(class_names)
+        detection_cache.clear()
+        start_process_pool()
     except Exception as e:
-        logger.error(f"Error loading model: {e}")
+        logger.error("Error loading model: %s", e)
         raise
 
 
+def start_process_pool():
+    """Start the CPU scan worker processes when running without a GPU"""
+    global process_pool
+    if process_pool is not None:
+        process_pool.shutdown(wait=False)
+        process_pool = None
+    
+    if device != "cpu" or PROCESS_POOL_WORKERS <= 1:
+        return
+    
+    # Same artifact as the in-process model, so cached results agree across endpoints
+    cpu_model_path = _find_cpu_model()
+    if cpu_model_path is None:
+        logger.info("No exported CPU model found, CPU scans stay in-process")
+        return
+    
+    logger.info("Starting %s scan workers on %s", PROCESS_POOL_WORKERS, cpu_model_path)
+    process_pool = ProcessPoolExecutor(
+        max_workers=PROCESS_POOL_WORKERS,
+        # Spawn rather than fork so workers don't inherit torch/OpenMP thread state
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_scan_worker,
+        initargs=(str(cpu_model_path), dict(class_names), list(fire_class_ids))
+    )
+    # Workers spawn lazily on submit; one no-op each loads and warms every model now
+    for _ in range(PROCESS_POOL_WORKERS):
+        process_pool.submit(ping_scan_worker)
+
+
+def find_fire_class_ids(names: Dict[int, str]) -> List[int]:
+    """Return the IDs of fire-related classes (names containing "fire" or "flame")"""
+    fire_ids = sorted(
+        i for i, name in names.items()
+        if "fire" in name.lower() or "flame" in name.lower()
+    )
+    if not fire_ids:
+        logger.warning("Model has no fire-related classes; detections will always be empty")
+    return fire_ids
+
+
+async def connect_triton():
+    """Connect to the Triton server and read the class names of the served model"""
+    global triton_client, class_names, fire_class_ids
+    if triton_http is None:
+        raise RuntimeError("tritonclient is not installed, cannot use TRITON_URL")
+    
+    logger.info("Connecting to Triton at %s (model: %s)", TRITON_URL, TRITON_MODEL_NAME)
+    triton_client = triton_http.InferenceServerClient(url=TRITON_URL)
+    config = await triton_client.get_model_config(TRITON_MODEL_NAME)
+    names = json.loads(config["parameters"]["names"]["string_value"])
+    class_names = {int(k): v for k, v in names.items()}
+    fire_class_ids = find_fire_class_ids(class_names)
+    detection_cache.clear()
+    logger.info("Triton model ready")
+
+
+def setup_predictor():
+    """
+    Build the Ultralytics predictor once and allocate reusable input buffers
+    
+    Inference then feeds prepared tensors straight to the predictor's backend,
+    skipping the per-call letterbox/normalize/upload done by model(image).
+    """
+    global input_device, input_dtype, staging_buffer, staging_event, batch_buffer
+    
+    model.predict(
+        np.zeros((IMGSZ, IMGSZ, 3), dtype=np.uint8),
+        verbose=False, conf=CONF_THRESHOLD, device=device, half=half, imgsz=IMGSZ
+    )
+    backend = model.predictor.model
+    input_device = model.predictor.device
+    input_dtype = torch.float16 if backend.fp16 else torch.float32
+    
+    if input_device.type == "cuda":
+        staging_buffer = torch.empty(IMGSZ * IMGSZ * 3, dtype=torch.uint8, pin_memory=True)
+        staging_event = torch.cuda.Event()
+    else:
+        staging_buffer = None
+        staging_event = None
+    batch_buffer = None
+    capture_cuda_graph()
+
+
+def capture_cuda_graph():
+    """
+    Record a batch-1 forward pass into a CUDA graph for single-image inference
+    
+    Only PyTorch weights are captured; TensorRT engines run their own
+    synchronous launch and stay on the eager path, as do batched scans.
+    
+    The Detect head replaces its anchors/strides whenever the input shape
+    (batch included) changes, so the captured tensors are pinned in
+    graph_anchors and the replay is checked against eager after a batch-2 pass.
+    """
+    global cuda_graph, graph_input, graph_output, graph_anchors
+    cuda_graph = None
+    graph_input = None
+    graph_output = None
+    graph_anchors = None
+    
+    backend = model.predictor.model
+    if not (USE_CUDA_GRAPH and input_device.type == "cuda" and backend.pt):
+        return
+    
+    try:
+        static_input = torch.zeros((1, 3, IMGSZ, IMGSZ), dtype=input_dtype, device=input_device)
+        with torch.inference_mode():
+            # Warm up on a side stream so lazy allocations happen outside capture
+            stream = torch.cuda.Stream()
+            stream.wait_stream(torch.cuda.current_stream())
+            with torch.cuda.stream(stream):
+                for _ in range(3):
+                    backend(static_input)
+            torch.cuda.current_stream().wait_stream(stream)
+            
+            graph = torch.cuda.CUDAGraph()
+            with torch.cuda.graph(graph):
+                static_output = backend(static_input)
+            detect = backend.model.model[-1]
+            anchors = (detect.anchors, detect.strides)
+            
+            # A batched scan rebuilds the head's anchors; replays must still match eager
+            backend(torch.zeros((2, 3, IMGSZ, IMGSZ), dtype=input_dtype, device=input_device))
+            static_input.normal_(0.5, 0.25).clamp_(0, 1)
+            graph.replay()
+            replayed = _first_output(static_output).clone()
+            expected = _first_output(backend(static_input))
+            if not torch.allclose(replayed, expected, rtol=1e-2, atol=1e-2):
+                raise RuntimeError("graph replay diverges from eager output")
+        
+        cuda_graph, graph_input, graph_output, graph_anchors = graph, static_input, static_output, anchors
+        logger.info("Captured CUDA graph for single-image inference")
+    except Exception as e:
+        logger.warning("CUDA graph capture failed, using eager inference: %s", e)
+
+
+def _first_output(preds) -> torch.Tensor:
+    """Prediction tensor of a backend output that may carry extra feature maps"""
+    return preds[0] if isinstance(preds, (list, tuple)) else preds
+
+
+def warmup_model():
+    """
+    Run a few dummy inferences so first-request latency excludes CUDA context
+    init, cuDNN/TensorRT algorithm selection and lazy allocations
+    """
+    if model is None or WARMUP_ITERATIONS <= 0:
+        return
+    
+    logger.info("Warming up model (%s iterations)...", WARMUP_ITERATIONS)
+    dummy = torch.zeros((1, 3, IMGSZ, IMGSZ), dtype=input_dtype, device=input_device)
+    for _ in range(WARMUP_ITERATIONS):
+        _infer(dummy)
+    if input_device.type == "cuda":
+        torch.cuda.synchronize(input_device)
+    logger.info("Warmup complete")
+
+
+def resolve_image_path(image_path: str) -> Path:
+    """Resolve a public image path and make sure the file exists"""
+    full_image_path = PUBLIC_DIR / image_path.lstrip("/")
+    
+    if not full_image_path.exists():
+        logger.error("Image file not found: %s", full_image_path)
+        raise FileNotFoundError(f"Image file not found: {full_image_path}")
+    
+    return full_image_path
+
+
+def load_input_tensor(
+    full_image_path: Path, out: Optional[torch.Tensor] = None
+) -> Tuple[torch.Tensor, Tuple[int, int]]:
+    """
+    Load an image as a model-ready tensor
+    
+    Unchanged files never get here twice: detection_cache already answers
+    them by (path, mtime), so input tensors are not cached.
+    
+    Args:
+        full_image_path: Path to the image file
+        out: Optional (3, IMGSZ, IMGSZ) slot (e.g. of batch_buffer) to fill in place
+        
+    Returns:
+        Letterboxed (3, IMGSZ, IMGSZ) tensor on the inference device and the
+        original (height, width) of the image
+    """
+    if (GPU_JPEG_DECODE and input_device.type == "cuda"
+            and full_image_path.suffix.lower() in JPEG_EXTENSIONS):
+        data = full_image_path.read_bytes()
+        # nvJPEG ignores EXIF orientation; rotated frames take the CPU path, which applies it
+        try:
+            if jpeg_orientation(data) == 1:
+                return preprocess_jpeg_gpu(data, out)
+        except RuntimeError as e:
+            logger.warning("GPU JPEG decode failed for %s, decoding on CPU: %s", full_image_path, e)
+    
+    image = read_image(full_image_path)
+    return preprocess(image, out), image.shape[:2]
+
+
+def preprocess(image: np.ndarray, out: Optional[torch.Tensor] = None) -> torch.Tensor:
+    """
+    Letterbox a BGR image into a normalized RGB CHW tensor on the inference device
+    
+    The image is resized straight into the (pinned) staging buffer, so only the
+    resized pixels cross to the device; channel swap, transpose, cast, scaling
+    and padding then happen in one pass on the device.
+    
+    Args:
+        image: HWC uint8 BGR image
+        out: Optional (3, IMGSZ, IMGSZ) tensor to write into instead of allocating
+        
+    Returns:
+        (3, IMGSZ, IMGSZ) tensor matching ultralytics' centered letterbox
+    """
+    nh, nw, top, left = letterbox_geometry(*image.shape[:2])
+    
+    if staging_event is None:
+        # CPU: each worker thread resizes into its own buffer, so no lock is needed
+        src = resize_into(_thread_staging_buffer(), image, nh, nw)
+    else:
+        with inference_lock:
+            # Wait for the previous upload before overwriting the shared pinned buffer
+            staging_event.synchronize()
+            src = resize_into(staging_buffer, image, nh, nw).to(input_device, non_blocking=True)
+            staging_event.record()
+    
+    tensor = _letterbox_canvas(out)
+    tensor[:, top:top + nh, left:left + nw] = src.permute(2, 0, 1).flip(0).to(input_dtype).div_(255.0)
+    return tensor
+
+
+def _letterbox_canvas(out: Optional[torch.Tensor]) -> torch.Tensor:
+    """Gray (114) letterbox canvas: the given tensor filled in place, or a new one"""
+    if out is None:
+        return torch.full((3, IMGSZ, IMGSZ), 114 / 255.0, dtype=input_dtype, device=input_device)
+    return out.fill_(114 / 255.0)
+
+
+def _thread_staging_buffer() -> torch.Tensor:
+    """Return this thread's CPU staging buffer, allocating it on first use"""
+    buffer = getattr(staging_local, "buffer", None)
+    if buffer is None:
+        buffer = torch.empty(IMGSZ * IMGSZ * 3, dtype=torch.uint8)
+        staging_local.buffer = buffer
+    return buffer
+
+
+def preprocess_jpeg_gpu(
+    data: bytes, out: Optional[torch.Tensor] = None
+) -> Tuple[torch.Tensor, Tuple[int, int]]:
+    """
+    Decode a JPEG with nvJPEG and letterbox it without leaving the GPU
+    
+    Only the compressed bytes cross PCIe (via the pinned staging buffer when
+    they fit); decode, resize and normalization all run on the device.
+    
+    Args:
+        data: Encoded JPEG bytes of an upright (EXIF orientation 1) image
+        out: Optional (3, IMGSZ, IMGSZ) tensor to write into instead of allocating
+        
+    Returns:
+        (3, IMGSZ, IMGSZ) tensor and the original (height, width) of the image
+    """
+    with inference_lock:
+        staging_event.synchronize()
+        if len(data) <= staging_buffer.numel():
+            encoded = staging_buffer[:len(data)]
+            encoded.numpy()[:] = np.frombuffer(data, dtype=np.uint8)
+        else:
+            encoded = torch.frombuffer(bytearray(data), dtype=torch.uint8)
+        image = decode_jpeg(encoded, mode=ImageReadMode.RGB, device=input_device)
+        staging_event.record()
+    
+    h, w = image.shape[1:]
+    nh, nw, top, left = letterbox_geometry(h, w)
+    resized = F.interpolate(
+        image.unsqueeze(0).to(input_dtype), size=(nh, nw), mode="bilinear", align_corners=False
+    )[0]
+    
+    tensor = _letterbox_canvas(out)
+    tensor[:, top:top + nh, left:left + nw] = resized.div_(255.0)
+    return tensor, (h, w)
+
+
+def _infer(batch: torch.Tensor) -> List[torch.Tensor]:
+    """Run the model on a prepared (N, 3, IMGSZ, IMGSZ) batch and apply NMS"""
+    with torch.inference_mode():
+        with inference_lock:
+            if cuda_graph is not None and batch.shape[0] == 1:
+                graph_input.copy_(batch, non_blocking=True)
+                cuda_graph.replay()
+                # graph_output is overwritten by the next replay, so reduce it under the lock
+                return _nms(graph_output)
+            preds = model.predictor.inference(batch)
+        return _nms(preds)
+
+
+def _nms(preds) -> List[torch.Tensor]:
+    """Apply the fire detector's NMS for the served model's fire classes"""
+    return nms(preds, fire_class_ids)
+
+
+def _parse_result(det: torch.Tensor, orig_shape: Tuple[int, int]) -> Dict:
+    """Summarize fire detections for a single image of the served model"""
+    return parse_result(det, orig_shape, class_names)
+
+
+def get_cache_key(full_image_path: Path) -> Tuple[str, int]:
+    """Build the detection cache key for an image file"""
+    return (str(full_image_path), full_image_path.stat().st_mtime_ns)
+
+
+def get_cached_detection(key: Tuple[str, int]) -> Optional[Dict]:
+    """Return the cached detection for a cache key, or None if the file changed since"""
+    path, mtime_ns = key
+    entry = detection_cache.get(path)
+    if entry is not None and entry[0] == mtime_ns:
+        return entry[1]
+    return None
+
+
+def cache_detection(key: Tuple[str, int], result: Dict):
+    """Store a detection result, replacing the entry for any older version of the file"""
+    path, mtime_ns = key
+    with cache_lock:
+        detection_cache[path] = (mtime_ns, result)
+
+
+def detect_fire_in_batch(image_files: List[Path]) -> List[Optional[Dict]]:
+    """
+    Detect fire in up to MAX_BATCH_SIZE images with one batched YOLOv8 forward pass
+    
+    Images are decoded and letterboxed straight into batch_buffer, so memory
+    stays bounded by a single batch however many files a scan covers.
+    
+    Args:
+        image_files: Image files to detect fire in
+        
+    Returns:
+        Detection results in the same order as the files; None marks images that failed to load
+    """
+    global batch_buffer
+    
+    if model is None:
+        raise RuntimeError("YOLOv8 model not loaded")
+    if len(image_files) > MAX_BATCH_SIZE:
+        raise ValueError(f"At most {MAX_BATCH_SIZE} images per batch, got {len(image_files)}")
+    
+    results: List[Optional[Dict]] = [None] * len(image_files)
+    debug_logging = logger.isEnabledFor(logging.DEBUG)
+    with inference_lock:
+        if batch_buffer is None:
+            batch_buffer = torch.empty(
+                (MAX_BATCH_SIZE, 3, IMGSZ, IMGSZ),
+                dtype=input_dtype, device=input_device
+            )
+        
+        loaded = []
+        for index, image_file in enumerate(image_files):
+            if debug_logging:
+                logger.debug("Reading %s...", image_file.name)
+            try:
+                _, orig_shape = load_input_tensor(image_file, out=batch_buffer[len(loaded)])
+            except Exception as e:
+                logger.error("Error processing %s: %s", image_file.name, e)
+                continue
+            loaded.append((index, orig_shape))
+        
+        if loaded:
+            dets = _infer(batch_buffer[:len(loaded)])
+            for det, (index, orig_shape) in zip(dets, loaded):
+                results[index] = _parse_result(det, orig_shape)
+    return results
+
+
 def detect_fire_in_image(image_path: str) -> Dict:
     """
     Detect fire in an image file using YOLOv8
@@ -110,68 +644,226 @@ def detect_fire_in_image(image_path: str) -> Dict:
         raise RuntimeError("YOLOv8 model not loaded")
     
     # Resolve the actual file path
-    full_image_path = PUBLIC_DIR / image_path.lstrip("/")
+    full_image_path = resolve_image_path(image_path)
     
-    if not full_image_path.exists():
-        logger.error(f"Image file not found: {full_image_path}")
-        raise FileNotFoundError(f"Image file not found: {full_image_path}")
+    key = get_cache_key(full_image_path)
+    cached = get_cached_detection(key)
+    if cached is not None:
+        logger.debug("Using cached detection for %s", full_image_path)
+        return cached
     
-    logger.info(f"Processing image: {full_image_path}")
+    logger.debug("Processing image: %s", full_image_path)
     
     try:
-        # Read image
-        image = cv2.imread(str(full_image_path))
-        if image is None:
-            raise ValueError(f"Cannot open image file: {full_image_path}")
-        
-        fire_detected = False
-        max_confidence = 0.0
-        detections = []
-        
-        # Run YOLOv8 inference on the image
-        results = model(image, verbose=False, conf=0.5)
-        
-        # Process detections
-        for result in results:
-            boxes = result.boxes
-            if boxes is not None:
-                for box in boxes:
-                    conf = float(box.conf[0])
-                    cls = int(box.cls[0])
-                    
-                    # Check class names for fire-related labels
-                    class_name = result.names[cls] if cls < len(result.names) else f"class_{cls}"
-                    
-                    # Look for fire-related detections
-                    if "fire" in class_name.lower() or "flame" in class_name.lower():
-                        fire_detected = True
-                        max_confidence = max(max_confidence, conf)
-                        
-                        # Store bounding box details
-                        x1, y1, x2, y2 = box.xyxy[0].tolist()
-                        detections.append({
-                            "class": class_name,
-                            "confidence": conf,
-                            "bbox": [x1, y1, x2, y2]
-                        })
-        
-        # Final confidence score
-        final_confidence = max_confidence if detections else 0.0
-        
-        result = {
-            "fire_detected": fire_detected,
-            "accuracy": final_confidence,
-            "detections": detections if detections else []
-        }
+        tensor, orig_shape = load_input_tensor(full_image_path)
+        
+        # Run YOLOv8 inference on the prepared tensor
+        dets = _infer(tensor.unsqueeze(0))
+        result = _parse_result(dets[0], orig_shape)
+        cache_detection(key, result)
         
-        logger.info(f"Detection complete: {result}")
+        logger.debug("Detection complete: %s", result)
         return result
         
     except Exception as e:
-        logger.error(f"Error processing image: {e}")
+        logger.error("Error processing image: %s", e)
         raise
 
 
+async def detect_fire_in_image_triton(image_path: str) -> Dict:
+    """
+    Detect fire in an image file using the model served by Triton
+    
+    Concurrent calls are coalesced into batches by Triton's dynamic batcher.
+    
+    Args:
+        image_path: Path to the image file
+        
+    Returns:
+        Dictionary containing detection results
+    """
+    if triton_client is None:
+        raise RuntimeError("Triton client not connected")
+    
+    full_image_path = resolve_image_path(image_path)
+    
+    key = get_cache_key(full_image_path)
+    cached = get_cached_detection(key)
+    if cached is not None:
+        logger.debug("Using cached detection for %s", full_image_path)
+        return cached
+    
+    logger.debug("Processing image via Triton: %s", full_image_path)
+    
+    try:
+        # Decode and letterbox on the worker pool so concurrent scans overlap with the network
+        tensor, orig_shape = await run_in_pool(load_input_tensor, full_image_path)
+        batch = tensor.unsqueeze(0).cpu().numpy()
+        
+        infer_input = triton_http.InferInput("images", list(batch.shape), "FP32")
+        infer_input.set_data_from_numpy(batch)
+        response = await triton_client.infer(
+            TRITON_MODEL_NAME,
+            [infer_input],
+            outputs=[triton_http.InferRequestedOutput("output0")]
+        )
+        
+        preds = torch.from_numpy(response.as_numpy("output0"))
+        det = _nms(preds)[0]
+        result = _parse_result(det, orig_shape)
+        cache_detection(key, result)
+        
+        logger.debug("Detection complete: %s", result)
+        return result
+        
+    except Exception as e:
+        logger.error("Error processing image: %s", e)
+        raise
+
+
+def scan_images_in_process(image_files: List[Path]) -> List[Optional[Dict]]:
+    """Run batched in-process detection; None marks images that failed"""
+    results: List[Optional[Dict]] = [None] * len(image_files)
+    
+    pending = []
+    for index, image_file in enumerate(image_files):
+        try:
+            key = get_cache_key(image_file)
+        except OSError as e:
+            logger.error("Error processing %s: %s", image_file.name, e)
+            continue
+        cached = get_cached_detection(key)
+        if cached is not None:
+            results[index] = cached
+        else:
+            pending.append((index, key, image_file))
+    
+    # One batch at a time, keeping each finished batch even if a later one fails
+    for start in range(0, len(pending), MAX_BATCH_SIZE):
+        chunk = pending[start:start + MAX_BATCH_SIZE]
+        try:
+            detections = detect_fire_in_batch([image_file for _, _, image_file in chunk])
+        except Exception as e:
+            logger.error("Error running batch detection: %s", e)
+            continue
+        for (index, key, _), detection_result in zip(chunk, detections):
+            if detection_result is not None:
+                cache_detection(key, detection_result)
+                results[index] = detection_result
+    return results
+
+
+async def scan_images_with_triton(image_files: List[Path]) -> List[Optional[Dict]]:
+    """Send images to Triton concurrently, MAX_BATCH_SIZE in flight; None marks images that failed"""
+    # Enough in flight to fill one dynamic batch without flooding the client or the pool
+    in_flight = asyncio.Semaphore(MAX_BATCH_SIZE)
+    
+    async def detect(image_file: Path) -> Dict:
+        async with in_flight:
+            return await detect_fire_in_image_triton(f"/{image_file.name}")
+    
+    outcomes = await asyncio.gather(
+        *(detect(f) for f in image_files),
+        return_exceptions=True
+    )
+    results: List[Optional[Dict]] = []
+    for image_file, outcome in zip(image_files, outcomes):
+        if isinstance(outcome, Exception):
+            logger.error("Error processing %s: %s", image_file.name, outcome)
+            results.append(None)
+        else:
+            results.append(outcome)
+    return results
+
+
+async def run_in_pool(func, *args):
+    """Run a blocking inference call on the worker pool without stalling the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(inference_pool, func, *args)
+
+
+async def run_in_process_pool(func, *args):
+    """Run a picklable call on the scan worker processes"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(process_pool, func, *args)
+
+
+async def scan_images_with_process_pool(image_files: List[Path]) -> List[Optional[Dict]]:
+    """Fan uncached images out to the CPU worker processes; None marks images that failed"""
+    results: List[Optional[Dict]] = [None] * len(image_files)
+    
+    pending = []
+    for index, image_file in enumerate(image_files):
+        try:
+            key = get_cache_key(image_file)
+        except OSError as e:
+            logger.error("Error processing %s: %s", image_file.name, e)
+            continue
+        cached = get_cached_detection(key)
+        if cached is not None:
+            results[index] = cached
+        else:
+            pending.append((index, key, image_file))
+    
+    outcomes = await asyncio.gather(
+        *(run_in_process_pool(detect_in_scan_worker, str(f)) for _, _, f in pending),
+        return_exceptions=True
+    )
+    if any(isinstance(outcome, BrokenProcessPool) for outcome in outcomes):
+        # A crashed worker breaks the pool for good; replace it so the next scan works
+        logger.warning("Scan worker pool broke, restarting it")
+        start_process_pool()
+    for (index, key, image_file), outcome in zip(pending, outcomes):
+        if isinstance(outcome, Exception):
+            logger.error("Error processing %s: %s", image_file.name, outcome)
+            continue
+        cache_detection(key, outcome)
+        results[index] = outcome
+    return results
+
+
+def get_status_db() -> sqlite3.Connection:
+    """Return this thread's camera status DB connection, opening it on first use"""
+    conn = getattr(status_db_local, "conn", None)
+    if conn is None:
+        CAMERA_STATUS_DB.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(CAMERA_STATUS_DB), timeout=5.0)
+        # WAL lets readers in other workers proceed while one worker writes
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS camera_status ("
+            "camera_id TEXT PRIMARY KEY, status TEXT, confidence REAL, last_updated TEXT)"
+        )
+        conn.commit()
+        status_db_local.conn = conn
+    return conn
+
+
+def update_camera_statuses(rows: List[Tuple[str, str, float, str]]):
+    """
+    Upsert camera statuses in one short transaction
+    
+    Args:
+        rows: (camera_id, status, confidence, last_updated) tuples
+    """
+    conn = get_status_db()
+    with conn:
+        conn.executemany(
+            "INSERT INTO camera_status (camera_id, status, confidence, last_updated) "
+            "VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(camera_id) DO UPDATE SET "
+            "status = excluded.status, confidence = excluded.confidence, last_updated = excluded.last_updated",
+            rows
+        )
+
+
+async def run_in_status_db(func, *args):
+    """Run a camera status DB call on its own threads, off the event loop and the inference pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(status_db_pool, func, *args)
+
+
 def get_camera_id_from_path(video_path: str) -> str:
     """Extract camera ID from video path"""
     # Extract filename without extension
@@ -191,10 +883,26 @@ def get_camera_id_from_path(video_path: str) -> str:
 async def startup_event():
     """Initialize model on startup"""
     logger.info("Starting up...")
-    load_model()
+    await run_in_status_db(get_status_db)
+    if TRITON_URL:
+        await connect_triton()
+    else:
+        load_model()
+        warmup_model()
     logger.info("Startup complete")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release the Triton connection and inference workers on shutdown"""
+    if triton_client is not None:
+        await triton_client.close()
+    inference_pool.shutdown(wait=False)
+    status_db_pool.shutdown(wait=False)
+    if process_pool is not None:
+        process_pool.shutdown(wait=False)
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -220,14 +928,18 @@ async def detect_fire(request: DetectionRequest):
         camera_id = get_camera_id_from_path(request.video_path)
         
         # Run fire detection on image
-        detection_result = detect_fire_in_image(request.video_path)
+        if triton_client is not None:
+            detection_result = await detect_fire_in_image_triton(request.video_path)
+        else:
+            detection_result = await run_in_pool(detect_fire_in_image, request.video_path)
         
         # Update camera status
-        camera_status[camera_id] = {
-            "status": "fire" if detection_result["fire_detected"] else "normal",
-            "confidence": detection_result["accuracy"],
-            "last_updated": datetime.now().isoformat()
-        }
+        await run_in_status_db(update_camera_statuses, [(
+            camera_id,
+            "fire" if detection_result["fire_detected"] else "normal",
+            detection_result["accuracy"],
+            datetime.now().isoformat()
+        )])
         
         return DetectionResponse(
             camera_id=camera_id,
@@ -242,109 +954,112 @@ async def detect_fire(request: DetectionRequest):
         )
         
     except FileNotFoundError as e:
-        logger.error(f"Video file not found: {e}")
+        logger.error("Video file not found: %s", e)
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        logger.error(f"Error in detect_fire: {e}")
+        logger.error("Error in detect_fire: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/camera-status", response_model=List[CameraStatusResponse])
+def camera_status_list() -> List[Dict]:
+    """Serialize tracked camera statuses as plain CameraStatusResponse-shaped dicts"""
+    rows = get_status_db().execute(
+        "SELECT camera_id, status, confidence, last_updated FROM camera_status ORDER BY rowid"
+    ).fetchall()
+    return [
+        {"camera_id": camera_id, "status": status, "confidence": confidence, "last_updated": last_updated}
+        for camera_id, status, confidence, last_updated in rows
+    ]
+
+
+@app.get("/camera-status", responses={200: {"model": List[CameraStatusResponse]}})
 async def get_camera_status():
     """
     Get fire detection status for all registered cameras
     
     Returns:
-        List of CameraStatusResponse objects
+        List of camera statuses (CameraStatusResponse schema)
     """
     try:
-        cameras = []
-        for camera_id, status in camera_status.items():
-            cameras.append(CameraStatusResponse(
-                camera_id=camera_id,
-                status=status["status"],
-                confidence=status["confidence"],
-                last_updated=status["last_updated"]
-            ))
-        return cameras
+        return await run_in_status_db(camera_status_list)
     except Exception as e:
-        logger.error(f"Error in get_camera_status: {e}")
+        logger.error("Error in get_camera_status: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/scan-all", response_model=ScanAllResponse)
+@app.post("/scan-all", responses={200: {"model": ScanAllResponse}})
 async def scan_all():
     """
     Scan all videos in the public directory and update camera status
     
     Returns:
-        ScanAllResponse with overall fire detection status
+        Overall fire detection status (ScanAllResponse schema)
     """
     try:
         if not PUBLIC_DIR.exists():
             raise FileNotFoundError(f"Public directory not found: {PUBLIC_DIR}")
         
-        logger.info(f"Scanning all images in {PUBLIC_DIR}")
+        logger.debug("Scanning all images in %s", PUBLIC_DIR)
         
         # Find all image files
         image_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp'}
-        image_files = [
-            f for f in PUBLIC_DIR.glob('*')
-            if f.suffix.lower() in image_extensions
-        ]
+        image_files = []
+        # One scandir pass reuses each entry's cached type; only symlinks get stat-ed
+        with os.scandir(PUBLIC_DIR) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    ext = os.path.splitext(entry.name)[1].lower()
+                    if ext in image_extensions:
+                        image_files.append(Path(entry.path))
         
-        logger.info(f"Found {len(image_files)} image files")
+        logger.debug("Found %s image files", len(image_files))
         
         fire_count = 0
         
-        # Process each image
-        for image_file in image_files:
-            relative_path = f"/{image_file.name}"
-            camera_id = get_camera_id_from_path(relative_path)
+        if triton_client is not None:
+            detection_results = await scan_images_with_triton(image_files)
+        elif process_pool is not None:
+            detection_results = await scan_images_with_process_pool(image_files)
+        else:
+            detection_results = await run_in_pool(scan_images_in_process, image_files)
+        
+        # Update camera status from the detection results
+        status_rows = []
+        for image_file, detection_result in zip(image_files, detection_results):
+            camera_id = get_camera_id_from_path(f"/{image_file.name}")
             
-            try:
-                logger.info(f"Processing {image_file.name}...")
-                detection_result = detect_fire_in_image(relative_path)
-                
-                # Update camera status
-                camera_status[camera_id] = {
-                    "status": "fire" if detection_result["fire_detected"] else "normal",
-                    "confidence": detection_result["accuracy"],
-                    "last_updated": datetime.now().isoformat()
-                }
-                
-                if detection_result["fire_detected"]:
-                    fire_count += 1
-                    logger.info(f"Fire detected in {camera_id}: {detection_result['accuracy']:.2%}")
-                    
-            except Exception as e:
-                logger.error(f"Error processing {image_file.name}: {e}")
-                camera_status[camera_id] = {
-                    "status": "error",
-                    "confidence": 0.0,
-                    "last_updated": datetime.now().isoformat()
-                }
+            if detection_result is None:
+                status_rows.append((camera_id, "error", 0.0, datetime.now().isoformat()))
+                continue
+            
+            status_rows.append((
+                camera_id,
+                "fire" if detection_result["fire_detected"] else "normal",
+                detection_result["accuracy"],
+                datetime.now().isoformat()
+            ))
+            
+            if detection_result["fire_detected"]:
+                fire_count += 1
+                logger.warning("Fire detected in %s: %.2f%%", camera_id, detection_result["accuracy"] * 100)
         
-        # Build response
-        cameras = [
-            CameraStatusResponse(
-                camera_id=camera_id,
-                status=status["status"],
-                confidence=status["confidence"],
-                last_updated=status["last_updated"]
-            )
-            for camera_id, status in camera_status.items()
-        ]
-        
-        return ScanAllResponse(
-            total_cameras=len(camera_status),
-            fire_detected_count=fire_count,
-            cameras=cameras,
-            timestamp=datetime.now().isoformat()
+        await run_in_status_db(update_camera_statuses, status_rows)
+        logger.info(
+            "Scanned %d images: %d with fire, %d errors",
+            len(image_files), fire_count, detection_results.count(None)
         )
         
+        # Build response
+        cameras = await run_in_status_db(camera_status_list)
+        return {
+            "total_cameras": len(cameras),
+            "fire_detected_count": fire_count,
+            "cameras": cameras,
+            "timestamp": datetime.now().isoformat()
+        }
+        
     except Exception as e:
-        logger.error(f"Error in scan_all: {e}")
+        logger.error("Error in scan_all: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -353,11 +1068,16 @@ async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
-        "model_loaded": model is not None,
+        "model_loaded": model is not None or triton_client is not None,
         "timestamp": datetime.now().isoformat()
     }
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    workers = UVICORN_WORKERS
+    if workers > 1:
+        # Multiple workers need an import string so each process loads its own app
+        uvicorn.run("main:app", app_dir=str(Path(__file__).parent), host="0.0.0.0", port=8000, workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
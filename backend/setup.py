@@ -1,10 +1,25 @@
 """
 Setup script to download YOLOv8 model and create necessary directories
+
+Export tooling is not part of the API image; install it with
+`pip install -r requirements-export.txt` before running this script.
 """
 
 import os
+import ast
+import json
+import shutil
 from pathlib import Path
 from ultralytics import YOLO
+from ultralytics.data.augment import LetterBox
+from ultralytics.models.yolo.detect import DetectionTrainer
+from ultralytics.nn.modules import C2f, Conv, Detect
+import cv2
+import numpy as np
+import onnx
+import torch
+from torch import nn
+import yaml
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -14,6 +29,33 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 BACKEND_DIR = BASE_DIR / "backend"
 MODELS_DIR = BACKEND_DIR / "models"
 PUBLIC_DIR = BASE_DIR / "public"
+CALIBRATION_DIR = MODELS_DIR / "calibration"
+TRITON_REPOSITORY_DIR = BACKEND_DIR / "triton" / "model_repository"
+TRITON_MODEL_NAME = os.getenv("TRITON_MODEL_NAME", "fire_detector")
+# TensorRT shipped in the tritonserver:24.01 image; plans must be built with the same release
+TRITON_TENSORRT_VERSION = "8.6"
+
+IMGSZ = 640
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "32"))
+CALIBRATION_FRAMES = 300
+# Recorded camera frames to calibrate INT8 ranges on; public/ only holds a few stills
+CALIBRATION_SOURCE_DIR = Path(os.getenv("CALIBRATION_SOURCE_DIR", str(PUBLIC_DIR)))
+# Fewer distinct frames than this get padded with crops/flips, with a warning
+MIN_CALIBRATION_SOURCES = 100
+# Images served from public/ that are UI assets, not camera frames
+NON_FRAME_ASSETS = {"nyc-map"}
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp'}
+
+# "int8" or "fp16"; use fp16 when the INT8 mAP drop is outside tolerance
+ENGINE_PRECISION = os.getenv("ENGINE_PRECISION", "int8").lower()
+
+# Channel pruning: fraction of backbone/neck channels to remove (0.3-0.5; 0 disables),
+# and the fire dataset YAML used to fine-tune the pruned model
+PRUNE_SPARSITY = float(os.getenv("PRUNE_SPARSITY", "0"))
+PRUNE_DATA = os.getenv("PRUNE_DATA")
+PRUNE_EPOCHS = int(os.getenv("PRUNE_EPOCHS", "20"))
+# Largest mAP50-95 drop after fine-tuning that passes without a warning
+PRUNE_MAP_TOLERANCE = 0.02
 
 def setup_directories():
     """Create necessary directories"""
@@ -41,8 +83,522 @@ def download_model():
         logger.info("You may need to manually download the best.pt file from Ultralytics")
         raise
 
+def _calibration_variant(image, variant: int):
+    """Return a cropped/flipped copy of a frame so repeated sources still vary"""
+    if variant == 0:
+        return image
+    h, w = image.shape[:2]
+    scale = 1.0 - 0.1 * (variant % 5)
+    ch, cw = int(h * scale), int(w * scale)
+    y0 = (h - ch) * (variant % 3) // 2
+    x0 = (w - cw) * ((variant // 3) % 3) // 2
+    crop = image[y0:y0 + ch, x0:x0 + cw]
+    return cv2.flip(crop, 1) if variant % 2 else crop
+
+def build_calibration_dataset(names: dict) -> Path:
+    """Sample calibration frames from CALIBRATION_SOURCE_DIR and write a dataset YAML"""
+    images_dir = CALIBRATION_DIR / "images"
+    data_path = CALIBRATION_DIR / "calibration.yaml"
+    
+    if data_path.exists() and images_dir.exists() and any(images_dir.iterdir()):
+        logger.info(f"Calibration dataset already exists at {CALIBRATION_DIR}")
+        return data_path
+    
+    sources = sorted(
+        f for f in CALIBRATION_SOURCE_DIR.glob('*')
+        if f.suffix.lower() in IMAGE_EXTENSIONS and f.stem not in NON_FRAME_ASSETS
+    )
+    if not sources:
+        raise FileNotFoundError(f"No calibration images found in {CALIBRATION_SOURCE_DIR}")
+    
+    if len(sources) > CALIBRATION_FRAMES:
+        # Evenly spaced frames cover the whole recording rather than its first minutes
+        step = len(sources) / CALIBRATION_FRAMES
+        sources = [sources[int(i * step)] for i in range(CALIBRATION_FRAMES)]
+    elif len(sources) < MIN_CALIBRATION_SOURCES:
+        logger.warning(
+            f"Only {len(sources)} distinct calibration frames in {CALIBRATION_SOURCE_DIR}; padding "
+            f"with crops/flips, so INT8 ranges may not match real footage. Point "
+            f"CALIBRATION_SOURCE_DIR at recorded camera frames"
+        )
+    
+    images_dir.mkdir(parents=True, exist_ok=True)
+    frames = [cv2.imread(str(f)) for f in sources]
+    for i in range(CALIBRATION_FRAMES):
+        frame = frames[i % len(frames)]
+        if frame is None:
+            continue
+        variant = _calibration_variant(frame, i // len(frames))
+        cv2.imwrite(str(images_dir / f"{sources[i % len(sources)].stem}_{i:04d}.jpg"), variant)
+    
+    with open(data_path, "w") as f:
+        yaml.safe_dump({
+            "path": str(CALIBRATION_DIR),
+            "train": "images",
+            "val": "images",
+            "names": dict(names),
+        }, f)
+    
+    logger.info(f"Calibration dataset written to {CALIBRATION_DIR}")
+    return data_path
+
+def _calibration_blob(image, letterbox: LetterBox):
+    """Letterbox a BGR frame into a (1, 3, IMGSZ, IMGSZ) float32 RGB blob"""
+    image = letterbox(image=image)
+    blob = image[..., ::-1].transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+    return np.ascontiguousarray(blob)
+
+def _calibration_files():
+    """Sorted calibration frames written by build_calibration_dataset"""
+    return sorted((CALIBRATION_DIR / "images").glob("*.jpg"))
+
+def export_simplified_onnx(model_path: Path) -> Path:
+    """
+    Export an ONNX graph specialized for IMGSZ x IMGSZ inputs
+    
+    Only the batch dimension stays dynamic (for /scan-all); pinning the spatial
+    dimensions lets onnxsim fold the Shape/Gather/Unsqueeze chains and letterbox
+    constants that a fully dynamic export carries.
+    """
+    import onnxsim
+    
+    simplified_path = model_path.with_name(f"{model_path.stem}_simplified.onnx")
+    if simplified_path.exists():
+        logger.info(f"Simplified ONNX model already exists at {simplified_path}")
+        return simplified_path
+    
+    logger.info("Exporting ONNX model...")
+    exported = YOLO(str(model_path)).export(format="onnx", opset=17, imgsz=IMGSZ, dynamic=True, simplify=True)
+    
+    onnx_model = onnx.load(str(exported))
+    dims = onnx_model.graph.input[0].type.tensor_type.shape.dim
+    dims[2].dim_value = IMGSZ
+    dims[3].dim_value = IMGSZ
+    
+    logger.info("Simplifying ONNX graph for the fixed input shape...")
+    simplified, ok = onnxsim.simplify(onnx_model)
+    if not ok:
+        raise RuntimeError("onnxsim could not validate the simplified model")
+    del simplified.metadata_props[:]
+    simplified.metadata_props.extend(onnx_model.metadata_props)
+    onnx.save(simplified, str(simplified_path))
+    
+    logger.info(f"Simplified ONNX model saved to {simplified_path}")
+    return simplified_path
+
+class C2f_v2(nn.Module):
+    """
+    C2f with its split conv stored as two convs, following Torch-Pruning's YOLOv8 recipe
+    
+    Stock C2f chunks one conv's output in half, which channel pruning cannot
+    keep balanced; two independent convs can be pruned like any other layer.
+    Checkpoints holding this module are only loadable next to this script,
+    so the API serves the pruned model through its exports.
+    """
+    
+    def __init__(self, c2f: C2f):
+        super().__init__()
+        conv, bn = c2f.cv1.conv, c2f.cv1.bn
+        c = conv.out_channels // 2
+        self.cv0 = Conv(conv.in_channels, c, 1, 1)
+        self.cv1 = Conv(conv.in_channels, c, 1, 1)
+        for half, part in ((self.cv0, slice(0, c)), (self.cv1, slice(c, None))):
+            half.conv.weight.data.copy_(conv.weight.data[part])
+            for name in ("weight", "bias", "running_mean", "running_var"):
+                getattr(half.bn, name).data.copy_(getattr(bn, name).data[part])
+            half.bn.eps, half.bn.momentum = bn.eps, bn.momentum
+        self.cv2 = c2f.cv2
+        self.m = c2f.m
+        # Ultralytics' layer bookkeeping: input index, layer index, type and param count
+        self.f, self.i, self.type, self.np = c2f.f, c2f.i, c2f.type, c2f.np
+    
+    def forward(self, x):
+        y = [self.cv0(x), self.cv1(x)]
+        y.extend(m(y[-1]) for m in self.m)
+        return self.cv2(torch.cat(y, 1))
+
+def _replace_c2f(module: nn.Module):
+    """Swap every C2f under a module for the equivalent split-free C2f_v2"""
+    for name, child in module.named_children():
+        if isinstance(child, C2f):
+            setattr(module, name, C2f_v2(child))
+        else:
+            _replace_c2f(child)
+
+def _validate(yolo: YOLO):
+    """Return (mAP50-95, mAP50) of a model on PRUNE_DATA"""
+    metrics = yolo.val(data=PRUNE_DATA, imgsz=IMGSZ, plots=False, verbose=False)
+    return metrics.box.map, metrics.box.map50
+
+class _PrunedTrainer(DetectionTrainer):
+    """Detection trainer that fine-tunes the given (pruned) model instead of rebuilding it from YAML"""
+    
+    def get_model(self, cfg=None, weights=None, verbose=True):
+        return weights
+
+def prune_model(model_path: Path) -> Path:
+    """
+    Channel-prune the trained detector and fine-tune it on the fire dataset
+    
+    C2f blocks are first swapped for the split-free C2f_v2 (checked to give
+    the same outputs), then L1-norm channel pruning removes PRUNE_SPARSITY of
+    the backbone/neck channels; the Detect head keeps its layout. The model
+    is validated on PRUNE_DATA before pruning and after fine-tuning. Returns
+    the weights to export from.
+    """
+    pruned_path = model_path.with_name(f"{model_path.stem}_pruned.pt")
+    
+    if PRUNE_SPARSITY <= 0:
+        return model_path
+    
+    if pruned_path.exists():
+        logger.info(f"Pruned model already exists at {pruned_path}")
+        return pruned_path
+    
+    if not PRUNE_DATA:
+        logger.warning("PRUNE_DATA not set, skipping channel pruning")
+        return model_path
+    
+    try:
+        import torch_pruning as tp
+    except ImportError:
+        logger.warning("torch-pruning not installed, skipping channel pruning")
+        return model_path
+    
+    # Validation fuses Conv+BN in place, so the baseline runs on its own copy
+    base_map, base_map50 = _validate(YOLO(str(model_path)))
+    yolo = YOLO(str(model_path))
+    
+    model = yolo.model.float().eval()
+    for p in model.parameters():
+        p.requires_grad_(True)
+    
+    example_inputs = torch.rand(1, 3, IMGSZ, IMGSZ)
+    with torch.no_grad():
+        expected = model(example_inputs)[0]
+        _replace_c2f(model)
+        if not torch.allclose(model(example_inputs)[0], expected, rtol=1e-3, atol=1e-3):
+            raise RuntimeError("C2f_v2 swap changed the model outputs")
+    
+    ignored_layers = [m for m in model.modules() if isinstance(m, Detect)]
+    base_macs, base_params = tp.utils.count_ops_and_params(model, example_inputs)
+    pruner = tp.pruner.MagnitudePruner(
+        model,
+        example_inputs,
+        importance=tp.importance.MagnitudeImportance(p=1),
+        pruning_ratio=PRUNE_SPARSITY,
+        ignored_layers=ignored_layers,
+    )
+    pruner.step()
+    macs, params = tp.utils.count_ops_and_params(model, example_inputs)
+    logger.info(
+        f"Pruned {PRUNE_SPARSITY:.0%} of channels: params {base_params / 1e6:.2f}M -> {params / 1e6:.2f}M, "
+        f"GFLOPs {2 * base_macs / 1e9:.2f} -> {2 * macs / 1e9:.2f}"
+    )
+    
+    logger.info(f"Fine-tuning pruned model for {PRUNE_EPOCHS} epochs...")
+    yolo.train(
+        data=PRUNE_DATA,
+        epochs=PRUNE_EPOCHS,
+        imgsz=IMGSZ,
+        trainer=_PrunedTrainer,
+        project=str(MODELS_DIR / "prune_runs"),
+        name=model_path.stem,
+        exist_ok=True,
+    )
+    pruned_map, pruned_map50 = _validate(yolo)
+    logger.info(
+        f"mAP50-95 {base_map:.3f} -> {pruned_map:.3f}, mAP50 {base_map50:.3f} -> {pruned_map50:.3f} "
+        f"after pruning and fine-tuning"
+    )
+    if base_map - pruned_map > PRUNE_MAP_TOLERANCE:
+        logger.warning(
+            f"Pruning cost {base_map - pruned_map:.3f} mAP50-95 (tolerance {PRUNE_MAP_TOLERANCE}); "
+            "consider a lower PRUNE_SPARSITY or more PRUNE_EPOCHS"
+        )
+    
+    shutil.copy(yolo.trainer.best, pruned_path)
+    logger.info(f"Pruned model saved to {pruned_path}")
+    logger.warning(
+        f"The API keeps serving {model_path.name} exports; set MODEL_PATH={pruned_path} "
+        f"on the backend to serve the pruned model"
+    )
+    return pruned_path
+
+def _make_entropy_calibrator(trt, cache_path: Path):
+    """Create a TensorRT entropy calibrator over the calibration frames, cached on disk"""
+    
+    class EntropyCalibrator(trt.IInt8EntropyCalibrator2):
+        def __init__(self):
+            trt.IInt8EntropyCalibrator2.__init__(self)
+            self.files = iter(_calibration_files())
+            self.letterbox = LetterBox(new_shape=(IMGSZ, IMGSZ), auto=False)
+            self.device_input = torch.empty((1, 3, IMGSZ, IMGSZ), dtype=torch.float32, device="cuda")
+        
+        def get_batch_size(self):
+            return 1
+        
+        def get_batch(self, names):
+            for f in self.files:
+                image = cv2.imread(str(f))
+                if image is None:
+                    continue
+                self.device_input.copy_(torch.from_numpy(_calibration_blob(image, self.letterbox)))
+                return [int(self.device_input.data_ptr())]
+            return None
+        
+        def read_calibration_cache(self):
+            if cache_path.exists():
+                logger.info(f"Using calibration cache {cache_path}")
+                return cache_path.read_bytes()
+            return None
+        
+        def write_calibration_cache(self, cache):
+            cache_path.write_bytes(bytes(cache))
+    
+    return EntropyCalibrator()
+
+def build_engine(onnx_path: Path, engine_path: Path, int8: bool):
+    """
+    Build a TensorRT engine from the simplified ONNX graph
+    
+    The optimization profile pins the spatial shape and tunes kernels for the
+    single-image (1, 3, IMGSZ, IMGSZ) case, while still accepting batches up to
+    MAX_BATCH_SIZE. The engine is written with the same length-prefixed
+    metadata header Ultralytics uses, so YOLO() can load it directly.
+    """
+    import tensorrt as trt
+    
+    trt_logger = trt.Logger(trt.Logger.WARNING)
+    builder = trt.Builder(trt_logger)
+    network = builder.create_network(1 << int(trt.NetworkDefinitionCreationFlag.EXPLICIT_BATCH))
+    parser = trt.OnnxParser(network, trt_logger)
+    if not parser.parse_from_file(str(onnx_path)):
+        errors = [str(parser.get_error(i)) for i in range(parser.num_errors)]
+        raise RuntimeError(f"Failed to parse {onnx_path}: {errors}")
+    
+    config = builder.create_builder_config()
+    config.set_memory_pool_limit(trt.MemoryPoolType.WORKSPACE, 4 << 30)
+    
+    fixed_shape = (1, 3, IMGSZ, IMGSZ)
+    profile = builder.create_optimization_profile()
+    profile.set_shape(network.get_input(0).name, fixed_shape, fixed_shape, (MAX_BATCH_SIZE, 3, IMGSZ, IMGSZ))
+    config.add_optimization_profile(profile)
+    
+    config.set_flag(trt.BuilderFlag.FP16)
+    if int8:
+        config.set_flag(trt.BuilderFlag.INT8)
+        config.int8_calibrator = _make_entropy_calibrator(trt, CALIBRATION_DIR / "calibration.cache")
+        config.set_calibration_profile(profile)
+    
+    serialized = builder.build_serialized_network(network, config)
+    if serialized is None:
+        raise RuntimeError("TensorRT engine build failed")
+    
+    metadata = {p.key: p.value for p in onnx.load(str(onnx_path), load_external_data=False).metadata_props}
+    metadata["batch"] = str(MAX_BATCH_SIZE)
+    meta = json.dumps(metadata)
+    with open(engine_path, "wb") as f:
+        f.write(len(meta).to_bytes(4, byteorder="little", signed=True))
+        f.write(meta.encode())
+        f.write(serialized)
+
+def export_engine(model_path: Path):
+    """
+    Build a TensorRT engine next to the PyTorch weights
+    
+    INT8 calibration uses TensorRT's entropy calibrator with a calibration
+    cache, so rebuilds skip recalibration.
+    """
+    engine_path = model_path.with_suffix(".engine")
+    
+    if engine_path.exists():
+        logger.info(f"TensorRT engine already exists at {engine_path}")
+        return
+    
+    if not torch.cuda.is_available():
+        logger.warning("CUDA not available, skipping TensorRT export")
+        return
+    
+    try:
+        import tensorrt  # noqa: F401
+    except ImportError:
+        logger.warning("TensorRT not installed, skipping TensorRT export")
+        return
+    
+    onnx_path = export_simplified_onnx(model_path)
+    
+    if ENGINE_PRECISION == "int8":
+        try:
+            build_calibration_dataset(YOLO(str(model_path)).names)
+            logger.info("Building TensorRT INT8 engine...")
+            build_engine(onnx_path, engine_path, int8=True)
+            logger.info(f"Engine saved to {engine_path}")
+            return
+        except Exception as e:
+            logger.warning(f"INT8 build failed, falling back to FP16: {e}")
+    
+    logger.info("Building TensorRT FP16 engine...")
+    build_engine(onnx_path, engine_path, int8=False)
+    logger.info(f"Engine saved to {engine_path}")
+
+class _CalibrationReader:
+    """ONNX Runtime calibration reader over the letterboxed calibration frames"""
+    
+    def __init__(self, input_name: str):
+        self.input_name = input_name
+        self.letterbox = LetterBox(new_shape=(IMGSZ, IMGSZ), auto=False)
+        self.rewind()
+    
+    def get_next(self):
+        for f in self.files:
+            image = cv2.imread(str(f))
+            if image is None:
+                continue
+            return {self.input_name: _calibration_blob(image, self.letterbox)}
+        return None
+    
+    def rewind(self):
+        self.files = iter(_calibration_files())
+
+def _copy_onnx_metadata(src: Path, dst: Path):
+    """Carry Ultralytics metadata (names, stride, imgsz) over to a derived ONNX file"""
+    src_model = onnx.load(str(src), load_external_data=False)
+    dst_model = onnx.load(str(dst))
+    del dst_model.metadata_props[:]
+    dst_model.metadata_props.extend(src_model.metadata_props)
+    onnx.save(dst_model, str(dst))
+
+def quantize_onnx(fp32_path: Path, int8_path: Path):
+    """Statically quantize an ONNX model to INT8 (QDQ, per-channel weights) for ORT on CPU"""
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+    
+    prepared_path = fp32_path.with_name(f"{fp32_path.stem}_prep.onnx")
+    quant_pre_process(str(fp32_path), str(prepared_path))
+    
+    input_name = onnx.load(str(prepared_path), load_external_data=False).graph.input[0].name
+    reader = _CalibrationReader(input_name)
+    quantize_static(
+        str(prepared_path), str(int8_path), reader,
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+    )
+    prepared_path.unlink(missing_ok=True)
+    _copy_onnx_metadata(fp32_path, int8_path)
+
+def export_cpu_models(model_path: Path):
+    """
+    Export OpenVINO and ONNX Runtime INT8 models for CPU-only deployments
+    
+    Ultralytics fuses BatchNorm into the preceding convolutions before export,
+    so the quantized graphs only carry Conv/activation pairs.
+    """
+    openvino_dir = model_path.parent / f"{model_path.stem}_int8_openvino_model"
+    int8_path = model_path.with_name(f"{model_path.stem}_int8.onnx")
+    
+    model = YOLO(str(model_path))
+    try:
+        data_path = build_calibration_dataset(model.names)
+    except FileNotFoundError as e:
+        logger.warning(f"Skipping INT8 CPU exports, no calibration data: {e}")
+        try:
+            # The FP32 graph still gives CPU hosts an ONNX Runtime model
+            export_simplified_onnx(model_path)
+        except Exception as e:
+            logger.warning(f"ONNX export failed: {e}")
+        return
+    
+    if openvino_dir.exists():
+        logger.info(f"OpenVINO model already exists at {openvino_dir}")
+    else:
+        try:
+            logger.info("Exporting OpenVINO INT8 model...")
+            model.export(format="openvino", int8=True, data=str(data_path), imgsz=IMGSZ, dynamic=True)
+            logger.info(f"OpenVINO model saved to {openvino_dir}")
+        except Exception as e:
+            logger.warning(f"OpenVINO export failed: {e}")
+    
+    if int8_path.exists():
+        logger.info(f"ONNX INT8 model already exists at {int8_path}")
+        return
+    
+    try:
+        simplified_path = export_simplified_onnx(model_path)
+        logger.info("Quantizing ONNX model to INT8...")
+        quantize_onnx(simplified_path, int8_path)
+        logger.info(f"ONNX INT8 model saved to {int8_path}")
+    except Exception as e:
+        logger.warning(f"ONNX INT8 export failed: {e}")
+
+def export_triton_repository(engine_path: Path):
+    """
+    Lay out a Triton model repository around the exported TensorRT engine
+    
+    The engine carries an Ultralytics-style length-prefixed metadata block;
+    it is stripped into a plain plan file and the class names are carried over
+    as a model config parameter. Inputs and outputs are auto-completed by
+    Triton from the plan.
+    """
+    if not engine_path.exists():
+        logger.warning(f"No TensorRT engine at {engine_path}, skipping Triton repository")
+        return
+    
+    try:
+        import tensorrt as trt
+    except ImportError:
+        logger.warning("TensorRT not installed, cannot verify the plan version, skipping Triton repository")
+        return
+    if not trt.__version__.startswith(f"{TRITON_TENSORRT_VERSION}."):
+        logger.warning(
+            f"Engine is built with TensorRT {trt.__version__} but Triton serves TensorRT "
+            f"{TRITON_TENSORRT_VERSION}; install requirements-export.txt and rebuild, skipping Triton repository"
+        )
+        return
+    
+    model_dir = TRITON_REPOSITORY_DIR / TRITON_MODEL_NAME
+    plan_path = model_dir / "1" / "model.plan"
+    plan_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    with open(engine_path, "rb") as f:
+        meta_len = int.from_bytes(f.read(4), byteorder="little")
+        metadata = json.loads(f.read(meta_len).decode("utf-8"))
+        plan_path.write_bytes(f.read())
+    
+    names = metadata["names"]
+    if isinstance(names, str):
+        # ONNX metadata stores the names dict as its Python repr
+        names = ast.literal_eval(names)
+    # Raw UTF-8 rather than \uXXXX escapes, which protobuf text format rejects
+    names = json.dumps({str(k): v for k, v in names.items()}, ensure_ascii=False)
+    config = f"""name: "{TRITON_MODEL_NAME}"
+platform: "tensorrt_plan"
+max_batch_size: {int(metadata.get("batch", MAX_BATCH_SIZE))}
+dynamic_batching {{
+  max_queue_delay_microseconds: 5000
+}}
+instance_group [
+  {{
+    kind: KIND_GPU
+    count: 1
+  }}
+]
+parameters {{
+  key: "names"
+  value {{ string_value: {json.dumps(names, ensure_ascii=False)} }}
+}}
+"""
+    (model_dir / "config.pbtxt").write_text(config, encoding="utf-8")
+    logger.info(f"Triton model repository written to {model_dir}")
+
 if __name__ == "__main__":
     logger.info("Starting setup...")
     setup_directories()
     download_model()
+    model_path = prune_model(MODELS_DIR / "best.pt")
+    export_cpu_models(model_path)
+    export_engine(model_path)
+    export_triton_repository(model_path.with_suffix(".engine"))
     logger.info("Setup complete!")
@@ -0,0 +1,84 @@
+"""
+Unit tests for the detection cache, the SQLite camera status store, and
+fire result parsing in main
+"""
+
+import os
+import threading
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("ultralytics")
+pytest.importorskip("fastapi")
+
+import main
+
+
+@pytest.fixture
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(main, "detection_cache", {})
+
+
+@pytest.fixture
+def status_db(tmp_path, monkeypatch):
+    """Point the camera status store at a fresh database for this test"""
+    monkeypatch.setattr(main, "CAMERA_STATUS_DB", tmp_path / "camera_status.db")
+    monkeypatch.setattr(main, "status_db_local", threading.local())
+    yield
+    conn = getattr(main.status_db_local, "conn", None)
+    if conn is not None:
+        conn.close()
+
+
+def test_cache_hits_until_file_changes(tmp_path, empty_cache):
+    image_file = tmp_path / "cam1.jpg"
+    image_file.write_bytes(b"frame")
+    result = {"fire_detected": True, "accuracy": 0.9}
+
+    key = main.get_cache_key(image_file)
+    main.cache_detection(key, result)
+    assert main.get_cached_detection(main.get_cache_key(image_file)) is result
+
+    # A rewritten frame gets a new mtime and must be detected again
+    stat = image_file.stat()
+    os.utime(image_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert main.get_cached_detection(main.get_cache_key(image_file)) is None
+
+
+def test_camera_statuses_upsert_in_insertion_order(status_db):
+    main.update_camera_statuses([
+        ("cam1", "normal", 0.0, "2024-01-01T00:00:00"),
+        ("cam2", "fire", 0.8, "2024-01-01T00:00:00"),
+    ])
+    main.update_camera_statuses([("cam1", "fire", 0.95, "2024-01-01T00:01:00")])
+
+    assert main.camera_status_list() == [
+        {"camera_id": "cam1", "status": "fire", "confidence": 0.95, "last_updated": "2024-01-01T00:01:00"},
+        {"camera_id": "cam2", "status": "fire", "confidence": 0.8, "last_updated": "2024-01-01T00:00:00"},
+    ]
+
+
+def test_parse_result_scales_fire_boxes(monkeypatch):
+    monkeypatch.setattr(main, "class_names", {0: "fire", 1: "smoke"})
+    # A 480x640 frame letterboxes at gain 1 with 80 px of padding above
+    det = torch.tensor([
+        [100.0, 180.0, 200.0, 280.0, 0.9, 0.0],
+        [0.0, 80.0, 64.0, 144.0, 0.6, 0.0],
+    ])
+
+    result = main._parse_result(det, (480, 640))
+
+    assert result["fire_detected"] is True
+    assert result["accuracy"] == pytest.approx(0.9)
+    assert [d["class"] for d in result["detections"]] == ["fire", "fire"]
+    assert result["detections"][0]["bbox"] == pytest.approx([100.0, 100.0, 200.0, 200.0])
+    assert result["detections"][1]["bbox"] == pytest.approx([0.0, 0.0, 64.0, 64.0])
+
+
+def test_parse_result_without_detections():
+    result = main._parse_result(torch.zeros((0, 6)), (480, 640))
+
+    assert result["fire_detected"] is False
+    assert result["accuracy"] == 0.0
+    assert result["detections"] == []
@@ -0,0 +1,50 @@
+"""
+Check that the fused letterbox in main.preprocess agrees with Ultralytics' LetterBox
+and that scale_boxes maps letterboxed boxes back onto the original frame
+"""
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("ultralytics")
+pytest.importorskip("fastapi")
+
+from ultralytics.data.augment import LetterBox
+from ultralytics.utils import ops
+
+import main
+
+# Non-square frames: landscape, portrait, and one with odd padding
+SHAPES = [(480, 640), (720, 405), (333, 500)]
+
+
+def reference_tensor(image: np.ndarray) -> torch.Tensor:
+    """Letterbox and normalize an image the way the Ultralytics predictor does"""
+    letterboxed = LetterBox(new_shape=(main.IMGSZ, main.IMGSZ), auto=False)(image=image)
+    chw = np.ascontiguousarray(letterboxed[..., ::-1].transpose(2, 0, 1))
+    return torch.from_numpy(chw).float() / 255.0
+
+
+@pytest.mark.parametrize("shape", SHAPES)
+def test_preprocess_matches_letterbox(shape):
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, (*shape, 3), dtype=np.uint8)
+
+    tensor = main.preprocess(image).float().cpu()
+    expected = reference_tensor(image)
+
+    assert tensor.shape == expected.shape
+    assert torch.allclose(tensor, expected, atol=1.5 / 255)
+
+
+@pytest.mark.parametrize("shape", SHAPES)
+def test_scale_boxes_inverts_letterbox(shape):
+    h, w = shape
+    nh, nw, top, left = main.letterbox_geometry(h, w)
+
+    # The resized image region in input space should map back to the full frame
+    boxes = torch.tensor([[left, top, left + nw, top + nh]], dtype=torch.float32)
+    scaled = ops.scale_boxes((main.IMGSZ, main.IMGSZ), boxes, (h, w))
+
+    assert torch.allclose(scaled, torch.tensor([[0.0, 0.0, w, h]]), atol=1.0)